@@ -3,63 +3,201 @@
 Outputs: ran_recently=true/false for a different-commit run on the same branch within a time window.
 """
 
+import atexit
+import functools
+import hashlib
+import http.client
 import os
 import json
-import urllib.request
 import logging
+import sys
+import time
+import urllib.parse
+from dataclasses import dataclass
 from datetime import datetime, timezone
 
+try:
+    import orjson  # ~2-5x faster JSON decode, parses bytes directly
+
+    _json_loads = orjson.loads
+except ImportError:  # optional; stdlib json also accepts bytes
+    _json_loads = json.loads
+
 
 # ────────────────────────── Logging ──────────────────────────
 
 
 def _setup_logging() -> None:
     """Configure logging with level set by LOG_LEVEL (DEBUG/INFO/WARNING/ERROR)."""
+    if logging.getLogger().handlers:  # already configured; keep repeat calls free
+        return
     level_name = os.environ.get("LOG_LEVEL", "INFO").upper()
     level = getattr(logging, level_name, logging.INFO)
     logging.basicConfig(level=level, format="[%(levelname)s] %(message)s")
-    logging.debug(f"logging level={level_name}")
+    logging.debug("logging level=%s", level_name)
 
 
 # ────────────────────────── Utilities ──────────────────────────
 
 
+GITHUB_API_HOST = "api.github.com"
+
+_MAX_ATTEMPTS = 4  # 1 try + up to 3 retries on rate limits / 5xx
+
+_conn: http.client.HTTPSConnection | None = None
+
+
+def _get_connection() -> http.client.HTTPSConnection:
+    """Return a lazily-created HTTPS connection to the GitHub API, reused across calls."""
+    global _conn
+    if _conn is None:
+        _conn = http.client.HTTPSConnection(GITHUB_API_HOST, timeout=30)
+        atexit.register(_conn.close)
+    return _conn
+
+
+@functools.lru_cache(maxsize=1)
+def _base_headers() -> dict[str, str]:
+    """Return the constant request headers, built (and the token read) once per process."""
+    return {
+        "Authorization": f"Bearer {os.environ['GITHUB_TOKEN']}",
+        "Accept": "application/vnd.github+json",
+        "User-Agent": "recent-run-check",
+        "Connection": "keep-alive",
+    }
+
+
+def _cache_paths(url: str) -> tuple[str, str]:
+    """Return (body_path, etag_path) for caching a URL's response on disk."""
+    key = hashlib.sha1(url.encode()).hexdigest()
+    base = os.path.join(os.environ.get("RUNNER_TEMP", "/tmp"), f"gh_cache_{key}")
+    return f"{base}.json", f"{base}.etag"
+
+
+def _http_get(path: str, headers: dict[str, str]) -> http.client.HTTPResponse:
+    """Issue a GET on the shared connection, reconnecting once if it was dropped."""
+    conn = _get_connection()
+    try:
+        conn.request("GET", path, headers=headers)
+        return conn.getresponse()
+    except (http.client.RemoteDisconnected, http.client.BadStatusLine):
+        # the server closed the kept-alive connection; reconnect once
+        logging.debug("keep-alive connection dropped; reconnecting")
+        conn.close()
+        conn.request("GET", path, headers=headers)
+        return conn.getresponse()
+
+
 def gh_api(url: str) -> dict:
-    """Call the GitHub API and return parsed JSON."""
-    logging.debug(f"http get {url}")
-    req = urllib.request.Request(
-        url,
-        headers={
-            "Authorization": f"Bearer {os.environ['GITHUB_TOKEN']}",
-            "Accept": "application/vnd.github+json",
-            "User-Agent": "recent-run-check",
-        },
-    )
-    with urllib.request.urlopen(req) as resp:
-        status = resp.getcode()
+    """Call the GitHub API and return parsed JSON.
+
+    Sends 'If-None-Match' when a previous response for the same URL was
+    cached on disk; a 304 reply has no body, does not count against the
+    rate limit, and is answered from the cache.
+    """
+    logging.debug("http get %s", url)
+    split = urllib.parse.urlsplit(url)
+    path = f"{split.path}?{split.query}" if split.query else split.path
+    headers = dict(_base_headers())  # copy: If-None-Match is per-request
+
+    body_path, etag_path = _cache_paths(url)
+    if os.path.exists(body_path) and os.path.exists(etag_path):
+        with open(etag_path) as f:
+            headers["If-None-Match"] = f.read().strip()
+
+    for attempt in range(_MAX_ATTEMPTS):
+        resp = _http_get(path, headers)
+        status = resp.status
         rl_rem = resp.headers.get("x-ratelimit-remaining")
-        data = json.loads(resp.read().decode("utf-8"))
+        body = resp.read()  # always drain so the connection stays reusable
+
+        rate_limited = status in (403, 429) and rl_rem == "0"
+        if not (rate_limited or status >= 500) or attempt == _MAX_ATTEMPTS - 1:
+            break
+        if rate_limited:
+            # wait out the limit, per Retry-After or the reset timestamp
+            retry_after = resp.headers.get("retry-after")
+            delay = (
+                float(retry_after)
+                if retry_after
+                else float(resp.headers.get("x-ratelimit-reset", "0")) - time.time()
+            )
+            delay = min(max(delay, 1.0), 60.0)
+        else:  # transient 5xx
+            delay = min(2**attempt, 30)
+        logging.warning(
+            "http %s from %s; retrying in %.0fs (attempt %s/%s)",
+            status,
+            url,
+            delay,
+            attempt + 1,
+            _MAX_ATTEMPTS - 1,
+        )
+        time.sleep(delay)
+
+    if status == 304:
+        logging.debug("http 304 (not modified); serving cached body for %s", url)
+        try:
+            with open(body_path, "rb") as f:
+                return _json_loads(f.read())
+        except (OSError, ValueError):
+            # the cached body was evicted or corrupted after the conditional
+            # header was sent; fall back to an unconditional GET
+            logging.warning("cached body for %s unusable; refetching", url)
+            del headers["If-None-Match"]
+            resp = _http_get(path, headers)
+            status = resp.status
+            rl_rem = resp.headers.get("x-ratelimit-remaining")
+            body = resp.read()
+
+    if status >= 400:  # retries exhausted (or a non-retriable error like 404)
+        raise RuntimeError(f"GitHub API returned {status} for {url}")
+
+    data = _json_loads(body)  # bytes in, no intermediate str
+    etag = resp.headers.get("ETag")
+    if etag:
+        with open(body_path, "wb") as f:
+            f.write(body)
+        with open(etag_path, "w") as f:
+            f.write(etag)
+
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        # guarded: list(data.keys()) allocates on every call otherwise
         logging.debug(
-            f"http {status}; rate_limit_remaining={rl_rem}; keys={list(data.keys())}"
+            "http %s; rate_limit_remaining=%s; keys=%s", status, rl_rem, list(data.keys())
         )
-        return data
+    return data
 
 
 def parse_utc(ts: str) -> datetime:
-    """Convert a GitHub ISO8601 timestamp into a timezone-aware datetime."""
-    return datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    """Convert a GitHub ISO8601 timestamp ('YYYY-MM-DDTHH:MM:SSZ') into a timezone-aware datetime."""
+    # GitHub timestamps have a fixed layout, so slice directly instead of
+    # paying for fromisoformat's general parser (plus a string copy for 'Z')
+    if len(ts) == 20 and ts[-1] == "Z":
+        return datetime(
+            int(ts[0:4]),
+            int(ts[5:7]),
+            int(ts[8:10]),
+            int(ts[11:13]),
+            int(ts[14:16]),
+            int(ts[17:19]),
+            tzinfo=timezone.utc,
+        )
+    return datetime.fromisoformat(ts.replace("Z", "+00:00"))  # unexpected shape
 
 
-def calculate_age_seconds(ts: str) -> float:
-    """Return how many seconds have elapsed since the given timestamp."""
-    return (datetime.now(timezone.utc) - parse_utc(ts)).total_seconds()
+def calculate_age_seconds(ts: str, now: datetime | None = None) -> float:
+    """Return how many seconds have elapsed between the given timestamp and `now` (default: current time)."""
+    if now is None:
+        now = datetime.now(timezone.utc)
+    return (now - parse_utc(ts)).total_seconds()
 
 
-def humanize_seconds(s: float | None) -> str:
+def humanize_seconds(s: int | None) -> str:
     """Return a short human string for seconds like '8m 12s' or '—' if None."""
     if s is None:
         return "—"
-    s = int(max(0, s))
+    s = max(0, s)
     m, sec = divmod(s, 60)
     h, m = divmod(m, 60)
     if h:
@@ -69,51 +207,106 @@ def humanize_seconds(s: float | None) -> str:
     return f"{sec}s"
 
 
+@functools.lru_cache(maxsize=1)
 def get_workflow_file() -> str:
     """Extract the workflow filename from GITHUB_WORKFLOW_REF."""
     ref = os.environ["GITHUB_WORKFLOW_REF"]
-    return ref.split(".github/workflows/")[1].split("@")[0]
+    # partition returns tuples, avoiding the intermediate lists split builds
+    return ref.partition(".github/workflows/")[2].partition("@")[0]
 
 
+@functools.lru_cache(maxsize=1)
 def get_owner_repo() -> tuple[str, str]:
     """Return (owner, repo) parsed from GITHUB_REPOSITORY."""
-    return tuple(os.environ["GITHUB_REPOSITORY"].split("/", 1))
+    owner, _, repo = os.environ["GITHUB_REPOSITORY"].partition("/")
+    return owner, repo
+
+
+# ──────────────────────── Configuration ────────────────────────
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Immutable snapshot of the env vars that drive one invocation."""
+
+    token: str
+    owner: str
+    repo: str
+    branch: str
+    default_branch: str
+    workflow_file: str
+    current_run: str
+    current_sha: str
+    job_name: str
+    event: str
+    window: int
+    scope: str
+    always_false_default: bool
+
+    @classmethod
+    def from_env(cls) -> "Config":
+        """Build the config from the env vars set by action.yml."""
+        owner, repo = get_owner_repo()
+        return cls(
+            token=os.environ["GITHUB_TOKEN"],
+            owner=owner,
+            repo=repo,
+            branch=os.environ["GITHUB_REF_NAME"],
+            default_branch=os.environ["GITHUB_DEFAULT_BRANCH"],
+            workflow_file=get_workflow_file(),
+            current_run=os.environ["GITHUB_RUN_ID"],
+            current_sha=os.environ["GITHUB_SHA"],
+            job_name=os.environ["GITHUB_JOB"],
+            event=os.environ.get("GITHUB_EVENT_NAME", ""),
+            window=int(os.environ["WINDOW_SECONDS"]),
+            scope=os.environ["SCOPE"].lower(),
+            always_false_default=(
+                os.environ["ALWAYS_FALSE_ON_DEFAULT_BRANCH"].lower() == "true"
+            ),
+        )
 
 
 # ───────────────────── Workflow-level logic ─────────────────────
 
 
-def get_latest_prior_different_commit_run() -> dict | None:
-    """Return the most recent prior workflow run on this branch that used a different commit SHA."""
-    owner, repo = get_owner_repo()
-    wf = get_workflow_file()
-    branch = os.environ["GITHUB_REF_NAME"]
-    current_run = os.environ["GITHUB_RUN_ID"]
-    current_sha = os.environ["GITHUB_SHA"]
+@functools.lru_cache(maxsize=1)
+def get_latest_prior_different_commit_run(cfg: Config) -> dict | None:
+    """Return the most recent prior workflow run on this branch that used a different commit SHA.
 
-    url = (
-        f"https://api.github.com/repos/{owner}/{repo}/actions/workflows/{wf}/runs"
-        f"?branch={branch}&per_page=10"
+    Cached so the runs-listing API call happens at most once per process;
+    the frozen config cannot change during a run.
+    """
+    base_url = (
+        f"https://api.github.com/repos/{cfg.owner}/{cfg.repo}/actions/workflows/"
+        f"{cfg.workflow_file}/runs?branch={cfg.branch}&exclude_pull_requests=true"
     )
-    for run in gh_api(url).get("workflow_runs", []):
-        rid = str(run["id"])
-        sha = run.get("head_sha")
-        if rid == current_run:
-            logging.debug(f"skip run_id={rid} (current)")
-            continue
-        if sha == current_sha:
-            logging.debug(f"skip run_id={rid} (same sha={sha})")
-            continue
-        logging.info(f"prior different-commit run found: run_id={rid} sha={sha}")
-        return run
+    # pre-filter server-side to runs of the same trigger event when known
+    if cfg.event:
+        base_url += f"&event={cfg.event}"
+    # the prior different-commit run is nearly always among the newest few,
+    # so try a small page first and only re-fetch a larger one if needed
+    for per_page in (3, 10):
+        for run in gh_api(f"{base_url}&per_page={per_page}").get("workflow_runs", []):
+            rid = str(run["id"])
+            if rid == cfg.current_run:
+                logging.debug("skip run_id=%s (current)", rid)
+                continue
+            sha = run.get("head_sha")
+            if sha == cfg.current_sha:
+                logging.debug("skip run_id=%s (same sha=%s)", rid, sha)
+                continue
+            logging.info(
+                "prior different-commit run found: run_id=%s sha=%s", rid, sha
+            )
+            return run
     logging.info("no prior different-commit workflow run found on this branch")
     return None
 
 
-def workflow_decision(window_seconds: int) -> tuple[bool, dict[str, str]]:
+def workflow_decision(cfg: Config, now: datetime) -> tuple[bool, dict[str, str]]:
     """Return (recent, details) for workflow scope decision."""
     details: dict[str, str] = {}
-    prior = get_latest_prior_different_commit_run()
+    prior = get_latest_prior_different_commit_run(cfg)
     if not prior:
         details.update(
             reason="no prior different-commit workflow run on this branch",
@@ -133,8 +326,8 @@ def workflow_decision(window_seconds: int) -> tuple[bool, dict[str, str]]:
         )
         return False, details
 
-    age = calculate_age_seconds(ts)
-    recent = age < window_seconds
+    age = calculate_age_seconds(ts, now)
+    recent = age < cfg.window
     details.update(
         reason=(
             "prior workflow run is within the window"
@@ -151,51 +344,65 @@ def workflow_decision(window_seconds: int) -> tuple[bool, dict[str, str]]:
 # ────────────────────── Job-level logic ──────────────────────
 
 
-def get_latest_prior_different_commit_run_id() -> str | None:
-    """Return the run ID of the latest prior different-commit workflow run, or None if none."""
-    prior = get_latest_prior_different_commit_run()
-    return str(prior["id"]) if prior else None
-
-
-def get_job_timestamp_in_run(run_id: str, job_name: str) -> str | None:
-    """Return the job timestamp (start or created_at) for a given job name in a given run ID."""
-    owner, repo = get_owner_repo()
-    url = f"https://api.github.com/repos/{owner}/{repo}/actions/runs/{run_id}/jobs?per_page=100"
-    jobs = gh_api(url).get("jobs", [])
-    for job in jobs:
-        if job.get("name") == job_name:
+def get_job_timestamp_in_run(cfg: Config, run_id: str) -> str | None:
+    """Return the job timestamp (start or created_at) for this job's name in a given run ID."""
+    url = (
+        f"https://api.github.com/repos/{cfg.owner}/{cfg.repo}/actions/runs/{run_id}/jobs"
+        f"?filter=latest&per_page=30"
+    )
+    for job in gh_api(url).get("jobs", []):
+        if job.get("name") == cfg.job_name:
             return job.get("started_at") or job.get("created_at")
-    logging.warning(f"job name='{job_name}' not found in prior run_id={run_id}")
+    logging.warning(
+        "job name='%s' not found in prior run_id=%s", cfg.job_name, run_id
+    )
     return None
 
 
-def job_decision(window_seconds: int) -> tuple[bool, dict[str, str]]:
+def job_decision(cfg: Config, now: datetime) -> tuple[bool, dict[str, str]]:
     """Return (recent, details) for job scope decision."""
     details: dict[str, str] = {}
-    last_run_id = get_latest_prior_different_commit_run_id()
-    if not last_run_id:
+    prior = get_latest_prior_different_commit_run(cfg)
+    if not prior:
         details.update(
             reason="no prior different-commit workflow run on this branch",
             age_seconds="—",
             prior_run_id="—",
             prior_timestamp="—",
-            job_name=os.environ["GITHUB_JOB"],
+            job_name=cfg.job_name,
         )
         return False, details
 
-    job_name = os.environ["GITHUB_JOB"]
-    ts = get_job_timestamp_in_run(last_run_id, job_name)
+    last_run_id = str(prior["id"])
+
+    # prune: no job activity can postdate the run's last update, so if even
+    # that timestamp is outside the window, skip the jobs fetch entirely
+    # (run_started_at is no bound here — jobs start *after* the run does)
+    run_ts = prior.get("updated_at")
+    if run_ts:
+        run_age = calculate_age_seconds(run_ts, now)
+        if run_age >= cfg.window:
+            details.update(
+                reason="prior run's last activity is outside the window",
+                age_seconds=str(int(run_age)),
+                prior_run_id=last_run_id,
+                prior_timestamp=run_ts,
+                job_name=cfg.job_name,
+            )
+            return False, details
+
+    ts = get_job_timestamp_in_run(cfg, last_run_id)
     if not ts:
         details.update(
             reason="prior run did not include a matching job",
             age_seconds="—",
             prior_run_id=last_run_id,
             prior_timestamp="—",
-            job_name=job_name,
+            job_name=cfg.job_name,
         )
     else:
-        age = calculate_age_seconds(ts)
-        recent = age < window_seconds
+        age = calculate_age_seconds(ts, now)
+        recent = age < cfg.window
         details.update(
             reason=(
                 "prior job run is within the window"
@@ -205,7 +412,7 @@ def job_decision(window_seconds: int) -> tuple[bool, dict[str, str]]:
             age_seconds=str(int(age)),
             prior_run_id=last_run_id,
             prior_timestamp=ts,
-            job_name=job_name,
+            job_name=cfg.job_name,
         )
         return recent, details
 
@@ -215,79 +422,67 @@ def job_decision(window_seconds: int) -> tuple[bool, dict[str, str]]:
 # ─────────────────────────── Summary ───────────────────────────
 
 
-def summary_lines(
-    scope: str, recent: bool, details: dict[str, str], window_seconds: int
-) -> list[str]:
-    """Return compact human-readable summary lines with a single decision emoji."""
-    branch = os.environ["GITHUB_REF_NAME"]
-    default_branch = os.environ["GITHUB_DEFAULT_BRANCH"]
-    always_false_default = (
-        os.environ["ALWAYS_FALSE_ON_DEFAULT_BRANCH"].lower() == "true"
-    )
+def _parse_age(s: str | None) -> int | None:
+    """Return an age string ('123' or '—') as an int, or None if unusable."""
+    try:
+        return int(s)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
 
+
+def summary_lines(cfg: Config, recent: bool, details: dict[str, str]) -> list[str]:
+    """Return compact human-readable summary lines with a single decision emoji."""
     age_raw = details.get("age_seconds")
-    age_h = humanize_seconds(float(age_raw) if age_raw and age_raw.isdigit() else None)
+    age_h = humanize_seconds(_parse_age(age_raw))
     emoji = "⚡⌚" if recent else "🐢🗓️"  # recent vs not recent
 
     lines = [
         f"{emoji} ran_recently: {'true' if recent else 'false'}",
         f"reason: {details.get('reason', '—')}",
-        f"context: scope={scope}, branch={branch}, window={window_seconds}s, age={age_h} ({age_raw or '—'}s)",
+        f"context: scope={cfg.scope}, branch={cfg.branch}, window={cfg.window}s, age={age_h} ({age_raw or '—'}s)",
         f"prior: run_id={details.get('prior_run_id', '—')}, timestamp={details.get('prior_timestamp', '—')}",
     ]
-    if scope == "job":
-        lines.append(f"job: name={details.get('job_name', os.environ['GITHUB_JOB'])}")
-    if always_false_default and branch == default_branch:
-        lines.append("note: default-branch protection active")
+    if cfg.scope == "job":
+        lines.append(f"job: name={details.get('job_name', cfg.job_name)}")
     return lines
 
 
 # ─────────────────────────── Runner ───────────────────────────
 
 
-def compute_decision() -> tuple[bool, dict[str, str], int, str]:
-    """Compute and return (recent, details, window_seconds, scope)."""
-    _setup_logging()
-
-    window = int(os.environ["WINDOW_SECONDS"])
-    scope = os.environ["SCOPE"].lower()
-    branch = os.environ["GITHUB_REF_NAME"]
-    default_branch = os.environ["GITHUB_DEFAULT_BRANCH"]
-    always_false_default = (
-        os.environ["ALWAYS_FALSE_ON_DEFAULT_BRANCH"].lower() == "true"
-    )
+def compute_decision(cfg: Config) -> tuple[bool, dict[str, str]]:
+    """Compute and return (recent, details)."""
+    logging.debug("scope=%s, window=%ss, branch=%s", cfg.scope, cfg.window, cfg.branch)
 
-    logging.debug(
-        f"scope={scope}, window={window}s, branch={branch}, default={default_branch}, "
-        f"always_false_on_default={always_false_default}"
-    )
+    # snapshot once so every age check shares the same reference time
+    now = datetime.now(timezone.utc)
 
-    if always_false_default and branch == default_branch:
-        details = {
-            "reason": "default-branch protection active",
-            "age_seconds": "—",
-            "prior_run_id": "—",
-            "prior_timestamp": "—",
-        }
-        return False, details, window, scope
-
-    if scope == "workflow":
-        recent, details = workflow_decision(window)
-    elif scope == "job":
-        recent, details = job_decision(window)
+    if cfg.scope == "workflow":
+        recent, details = workflow_decision(cfg, now)
+    elif cfg.scope == "job":
+        recent, details = job_decision(cfg, now)
     else:
-        logging.error(f"unrecognized SCOPE: {os.environ['SCOPE']}")
-        raise ValueError(f"Unrecognized SCOPE: {os.environ['SCOPE']}")
+        logging.error(f"unrecognized SCOPE: {cfg.scope}")
+        raise ValueError(f"Unrecognized SCOPE: {cfg.scope}")
 
-    return recent, details, window, scope
+    return recent, details
 
 
 def main() -> bool:
     """Execute the decision, print summary, and return bool."""
+    cfg = Config.from_env()
+
+    # fast path: every push to the default branch lands here, so decide
+    # before any API call or summary formatting
+    if cfg.always_false_default and cfg.branch == cfg.default_branch:
+        print("ran_recently: false (default-branch protection active)")
+        return False
+
+    _setup_logging()
     try:
-        recent, details, window, scope = compute_decision()
-        for line in summary_lines(scope, recent, details, window):
-            print(line)
+        recent, details = compute_decision(cfg)
+        # one write (and one flush) instead of a print per line
+        sys.stdout.write("\n".join(summary_lines(cfg, recent, details)) + "\n")
     except Exception as e:
         logging.exception(f"unhandled error: {e}")
         raise
@@ -296,5 +491,10 @@ def main() -> bool:
 
 
 if __name__ == "__main__":
-    with open(os.environ["GITHUB_OUTPUT"], "a") as f:
-        f.write(f"ran_recently={'true' if main() else 'false'}\n")
+    _setup_logging()  # configure up front so even output-write errors are logged
+    output = f"ran_recently={'true' if main() else 'false'}\n"
+    if "GITHUB_OUTPUT" in os.environ:
+        with open(os.environ["GITHUB_OUTPUT"], "a") as f:
+            f.write(output)
+    else:  # local run outside of GitHub Actions
+        print(output, end="")